@@ -7,10 +7,11 @@ import typer
 from .cli import Command
 
 app = typer.Typer()
+database_import_str_re = re.compile(r"^[^.]+(\.[^:]+)+:[^:]+$")
 
 
 def validate_database_import_str(value: str) -> str:
-    if not re.match(r"^[^.]+(\.[^:]+)+:[^:]+$", value):
+    if not database_import_str_re.match(value):
         raise typer.BadParameter("Value must be in the format 'app.database:db'")
     return value
 
@@ -19,9 +20,8 @@ def validate_database_import_str(value: str) -> str:
 def gen(database_import_str: Annotated[str, typer.Argument(help="Pony Database instance import string in the format 'app.path.to.file:db_var_name'. ",
                                                            callback=validate_database_import_str)]):
     """Introspects the database tables in the given database and generates pony models"""
-    source_code = "\n".join(Command(database_import_str).get_output())
     with Path("output.py").open("w") as file:
-        _ = file.write(source_code)
+        _ = file.write(Command(database_import_str).get_output())
 
 
 if __name__ == "__main__":
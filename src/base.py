@@ -1,9 +1,16 @@
-from typing import Any, ClassVar, NamedTuple, NotRequired, TypedDict
+from __future__ import annotations
 
-from attrs import define
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Mapping, NamedTuple, NotRequired, TypedDict, TypeVar
+
+from attrs import define, field
 from pony.orm.dbapiprovider import DBAPIProvider
-from psycopg2.extensions import connection as Connection
-from psycopg2.extensions import cursor as Cursor
+
+if TYPE_CHECKING:
+    from psycopg2.extensions import connection as Connection
+    from psycopg2.extensions import cursor as Cursor
+
+T = TypeVar('T')
 
 
 class TableInfo(NamedTuple):
@@ -23,7 +30,7 @@ class ColumnInfo(TypedDict):
     options: NotRequired[Any]
 
 
-@define(kw_only=True)
+@define(kw_only=True, slots=True)
 class FieldInfo:
     # Structure returned by the DB-API cursor.description interface (PEP 249)
     name: str
@@ -36,22 +43,39 @@ class FieldInfo:
     default: str | None = None
     extra: Any = None
     is_unsigned: bool | None = None
+    # computed once here rather than by scanning the default in every get_field_type. defaults to the sequence backed columns
+    # of postgres (serial & co.), backends with their own marker (mysql's auto_increment extra) pass it explicitly
+    is_autoincrement: bool = field()
 
+    @is_autoincrement.default
+    def _is_autoincrement_default(self) -> bool:
+        return self.default is not None and self.default.startswith('nextval')
 
-@define
-class TRelation:
+
+class TRelation(NamedTuple):
     field_name_ref: str
     table_ref: str
 
 
 @define
 class Introspection:
-    imports: ClassVar[dict[str, str]]
-    data_types_reverse: ClassVar[dict[str | int, str]]
-    ignored_tables: ClassVar[list[str]] = ['migration', 'pony_version']
+    imports: ClassVar[Mapping[str, str]]
+    data_types_reverse: ClassVar[Mapping[str | int, str]]
+    # pony's own bookkeeping tables, checked once per table so kept as a frozenset
+    ignored_tables: ClassVar[frozenset[str]] = frozenset({'migration', 'pony_version'})
+    # Rows fetched per round-trip by the server-side cursors used for the bulk catalog queries.
+    itersize: ClassVar[int] = 2000
+    # Below this many tables the catalog results are small enough to be fetched in one go, and the
+    # extra round-trips of a server-side cursor (DECLARE/FETCH/CLOSE on Postgres) would only add latency.
+    server_side_min_tables: ClassVar[int] = 200
+    # Number of threads the per-table fallbacks of the get_all_* methods are spread over, each with its own connection.
+    max_workers: ClassVar[int] = 8
 
     connection: Connection
     provider: DBAPIProvider
+    _constraints_cache: dict[str, dict[str, ColumnInfo]] = field(init=False, factory=dict)
+    _descriptions_cache: dict[str, list[FieldInfo]] = field(init=False, factory=dict)
+    _relations_cache: dict[str, dict[str, TRelation]] = field(init=False, factory=dict)
 
     def table_names(self, cursor: Cursor, include_views=False) -> list[str]:
         """
@@ -66,11 +90,20 @@ class Introspection:
         """
         Return the name of the primary key column for the given table.
         """
-        for constraint in self.get_constraints(cursor, table_name).values():
+        for constraint in self.get_cached_constraints(cursor, table_name).values():
             if constraint['primary_key']:
                 return constraint['columns']
         return []
 
+    def clear_caches(self) -> None:
+        """
+        Forget all the cached introspection results, e.g. after the schema has
+        been altered through this connection.
+        """
+        self._constraints_cache.clear()
+        self._descriptions_cache.clear()
+        self._relations_cache.clear()
+
     def get_table_list(self, cursor: Cursor) -> list[TableInfo]:
         """
         Return an unsorted list of TableInfo named tuples of all tables and
@@ -89,6 +122,15 @@ class Introspection:
     def get_constraints(self,  cursor: Cursor, table_name: str) -> dict[str, ColumnInfo]:
         ...
 
+    def get_cached_constraints(self, cursor: Cursor, table_name: str) -> dict[str, ColumnInfo]:
+        """
+        Return the constraints of the given table, querying the database only
+        the first time the table is requested.
+        """
+        if (constraints := self._constraints_cache.get(table_name)) is None:
+            constraints = self._constraints_cache[table_name] = self.get_constraints(cursor, table_name)
+        return constraints
+
     def get_table_description(self, cursor: Cursor, table_name: str) -> list[FieldInfo]:
         ...
 
@@ -97,3 +139,66 @@ class Introspection:
 
     def get_field_type(self, data_type: int | str, description: FieldInfo) -> tuple[str, dict[str, int] | None, str | None]:
         ...
+
+    def can_open_connections(self) -> bool:
+        """
+        Return whether other threads can open their own connections to the
+        same database. Backends override this when that isn't always the case.
+        """
+        return True
+
+    def map_tables(self, cursor: Cursor, method: Callable[[Cursor, str], T], table_names: list[str]) -> dict[str, T]:
+        """
+        Return a dictionary of {table_name: method(cursor, table_name)} for all
+        given tables. The per-table queries are independent and I/O bound, so
+        they are run concurrently on up to `max_workers` threads, each using its
+        own connection from the provider's (thread-local) pool.
+        """
+        if self.max_workers <= 1 or len(table_names) <= 1 or not self.can_open_connections():
+            return {table_name: method(cursor, table_name) for table_name in table_names}
+        workers = min(self.max_workers, len(table_names))
+
+        def run(chunk: list[str]) -> list[T]:
+            # the provider's pool is thread-local, so this opens a connection owned by (and closed in) the worker thread
+            connection, _is_new = self.provider.connect()
+            try:
+                worker_cursor = connection.cursor()
+                return [method(worker_cursor, table_name) for table_name in chunk]
+            finally:
+                self.provider.drop(connection)
+        chunks = [table_names[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(workers) as executor:
+            results = {table_name: result for chunk, chunk_results in zip(chunks, executor.map(run, chunks))
+                       for table_name, result in zip(chunk, chunk_results)}
+        return {table_name: results[table_name] for table_name in table_names}
+
+    def get_all_constraints(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, ColumnInfo]]:
+        """
+        Return a dictionary of {table_name: constraints} for all given tables.
+        Backends can override this to fetch every table in a single query.
+        """
+        return self.map_tables(cursor, self.get_cached_constraints, table_names)
+
+    def get_all_table_descriptions(self, cursor: Cursor, table_names: list[str]) -> dict[str, list[FieldInfo]]:
+        """
+        Return a dictionary of {table_name: description} for all given tables.
+        Backends can override this to fetch every table in a single query.
+        """
+        return self.map_tables(cursor, self.get_table_description, table_names)
+
+    def get_all_relations(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, TRelation]]:
+        """
+        Return a dictionary of {table_name: relations} for all given tables.
+        Backends can override this to fetch every table in a single query.
+        """
+        return self.map_tables(cursor, self.get_relations, table_names)
+
+    def get_all_primary_key_columns(self, cursor: Cursor, table_names: list[str]) -> dict[str, list[str]]:
+        """
+        Return a dictionary of {table_name: primary key columns} for all given
+        tables, reusing the constraints fetched by get_all_constraints.
+        """
+        # get_all_constraints fills the constraints cache, so only the tables missing from it are queried
+        if (missing := [table_name for table_name in table_names if table_name not in self._constraints_cache]):
+            self.get_all_constraints(cursor, missing)
+        return {table_name: next((c['columns'] for c in self._constraints_cache[table_name].values() if c['primary_key']), []) for table_name in table_names}
@@ -1,143 +1,207 @@
-from collections import OrderedDict, defaultdict
-from itertools import chain
-from typing import DefaultDict, Generator, cast
+from __future__ import annotations
+
+from collections import defaultdict
+from functools import cache
+from importlib import import_module
+from typing import TYPE_CHECKING, DefaultDict, NamedTuple, cast
 
 from attrs import define, field
 from pony.orm import db_session
-from psycopg2.extensions import connection as Connection
 
 from src.base import ColumnInfo, FieldInfo, Introspection, TRelation
-from src.mysql import Introspection as MysqlIntrospection
-from src.postgres import Introspection as PostgresIntrospection
 from src.sanitize_column_name import normalize_col_name, str_to_py_identifier
-from src.sqlite import Introspection as SqliteIntrospection
 from src.utils import import_from_string
 
-INROSPECTION_IMPL = {'postgresql': PostgresIntrospection, 'mysql': MysqlIntrospection, 'sqlite': SqliteIntrospection}
+if TYPE_CHECKING:
+    from psycopg2.extensions import connection as Connection
+    from psycopg2.pool import AbstractConnectionPool
 
+# backends are imported on first use so that only the driver of the target database gets loaded
+INROSPECTION_IMPL = {'postgresql': 'src.postgres', 'mysql': 'src.mysql', 'sqlite': 'src.sqlite'}
 
-@define
+BOOL_REPRS = {True: 'True', False: 'False'}
+
+
+def fast_repr(value: object) -> str:
+    """repr() with the common boolean kwargs served from a table (keyed by type, as 1 == True)"""
+    return BOOL_REPRS[value] if value.__class__ is bool else repr(value)
+
+
+@cache
+def get_introspection_impl(dialect: str) -> type[Introspection]:
+    """Import and return the Introspection implementation for the given pony provider dialect"""
+    return import_module(INROSPECTION_IMPL[dialect.casefold()]).Introspection
+
+
+@define(slots=True)
 class RelatedTable:
     table: str
     field: str
 
 
-@define(kw_only=True)
+def spans_two_tables(related_tables: list[RelatedTable]) -> bool:
+    """Return whether the related tables reference exactly two distinct tables, bailing out on a third one"""
+    first, second = related_tables[0].table, None
+    for related_table in related_tables:
+        if (table := related_table.table) == first:
+            continue
+        if second is None:
+            second = table
+        elif table != second:
+            return False
+    return second is not None
+
+
+@define(kw_only=True, slots=True)
 class FieldType:
     type: str
-    params: OrderedDict[str, str | int]
+    params: dict[str, str | int]
     notes: list[str]
 
 
-@define
-class TRelAttr:
+class TRelAttr(NamedTuple):
     name: str
     table: str
     cls: str
     reverse: str
-    kwargs: dict[str, str] = field(factory=dict)
+    kwargs: dict[str, str] | None = None
 
 
-@define
+@define(slots=True)
 class TIntrospection:
     relations: dict[str, TRelation] = field(factory=dict)
     rel_attrs: list[TRelAttr] = field(factory=list)
     description: list[FieldInfo] = field(factory=list)
     unique_columns: list[str] = field(factory=list)
     primary_key_columns: list[str] = field(factory=list)
+    primary_key_set: set[str] = field(factory=set)
     constraints: dict[str, ColumnInfo] = field(factory=dict)
 
 
 @define
 class Command:
-    KWARGS_ORDER = ['unique', 'nullable', 'default', 'column']
+    KWARGS_ORDER = ('unique', 'nullable', 'default', 'column')
     imports = {'from pony.orm import Required, Optional, PrimaryKey, Database'}
 
     database_import_str: str
+    # optional externally managed pool (e.g. ThreadedConnectionPool(1, 4, dsn) created once by the caller), so that repeated runs
+    # reuse an open connection instead of paying the connection setup latency every time
+    pool: AbstractConnectionPool | None = None
     introspection: Introspection = field(init=False)
-    field_counters: DefaultDict[tuple[str, str], int] = field(factory=lambda: defaultdict(int))
-    relations_counters: DefaultDict[tuple[str, str], int] = field(factory=lambda: defaultdict(int))
+    # nested {table: {name: count}} counters, so the hot increments hash a single string instead of building a tuple key
+    field_counters: DefaultDict[str, DefaultDict[str, int]] = field(factory=lambda: defaultdict(lambda: defaultdict(int)))
+    relations_counters: DefaultDict[str, DefaultDict[str, int]] = field(factory=lambda: defaultdict(lambda: defaultdict(int)))
+    _field_type_cache: dict[tuple[str | int, int | None, int | None, int | None, bool], FieldType] = field(init=False, factory=dict)
 
-    def get_output(self) -> Generator[str, None, None]:
-        lines = list(self._get_output())
-        yield "# This is an auto-generated module with pony entities."
-        yield ''
-        yield from self.imports
-        yield ''
-        yield from lines
+    def get_output(self) -> str:
+        """
+        Return the source of the generated module as a single string.
+        """
+        # the body is generated first as it collects the imports it needs
+        out: list[str] = []
+        self._get_output(out)
+        return '\n'.join(("# This is an auto-generated module with pony entities.", '', *sorted(self.imports), '', *out, ''))
 
     def _make_introspection(self, introspection: Introspection):
         cursor = introspection.connection.cursor()
         table_names = introspection.table_names(cursor)
-        ret = {table_name: TIntrospection(relations=introspection.get_relations(cursor, table_name),
-                                          constraints=(constraints := introspection.get_constraints(cursor, table_name)),
-                                          primary_key_columns=introspection.get_primary_key_columns(cursor, table_name),
-                                          unique_columns=list(chain.from_iterable((c['columns'] for c in constraints.values() if c['unique']))),
-                                          description=introspection.get_table_description(cursor, table_name)) for table_name in table_names}
-        for table_name in table_names:
-            # normalize field names & increment field name counters
-            for field_info in ret[table_name].description:
-                if field_info.name in ret[table_name].relations:
+        # fetch each kind of metadata for all tables at once instead of querying per table. the bulk methods return an entry
+        # for every requested table, so everything below is plain indexing into the known table set
+        all_relations = introspection.get_all_relations(cursor, table_names)
+        all_constraints = introspection.get_all_constraints(cursor, table_names)
+        all_primary_key_columns = introspection.get_all_primary_key_columns(cursor, table_names)
+        all_descriptions = introspection.get_all_table_descriptions(cursor, table_names)
+        ret = {table_name: TIntrospection(relations=all_relations[table_name],
+                                          constraints=(constraints := all_constraints[table_name]),
+                                          primary_key_columns=(primary_key_columns := all_primary_key_columns[table_name]),
+                                          primary_key_set=set(primary_key_columns),
+                                          unique_columns=[column for c in constraints.values() if c['unique'] for column in c['columns']],
+                                          description=all_descriptions[table_name]) for table_name in table_names}
+        field_counters, relations_counters = self.field_counters, self.relations_counters
+        for table_name, entry in ret.items():
+            relations, primary_key_set = entry.relations, entry.primary_key_set
+            table_counters = field_counters[table_name]
+            related_tables: list[RelatedTable] = []
+            # normalize field names & increment field name counters, collecting the related tables for the m2m check in the same pass
+            for field_info in entry.description:
+                if field_info.name in relations:
+                    if field_info.name not in primary_key_set:
+                        related_tables.append(RelatedTable(table=relations[field_info.name].table_ref, field=field_info.name))
                     continue
-                field_info.name, _kwargs, _notes = normalize_col_name(field_info.name)
-                field_info.name = f"{field_info.name}{self.field_counters[(table_name, field_info.name)] or ''}"
-                self.field_counters[(table_name, field_info.name)] += 1
+                name, _kwargs, _notes = normalize_col_name(field_info.name)
+                if (index := table_counters[name]):
+                    name += str(index)
+                field_info.name = name
+                table_counters[name] += 1
             # check if it's an m2m table
-            is_m2m = False
-            related_tables: list[RelatedTable] = []
-            for field_info in ret[table_name].description:
-                if field_info.name in ret[table_name].relations and field_info.name not in ret[table_name].primary_key_columns:
-                    related_tables.append(RelatedTable(table=ret[table_name].relations[field_info.name].table_ref, field=field_info.name))
-            else:
-                is_m2m = len(set(related_table.table for related_table in related_tables)) == 2
+            is_m2m = len(related_tables) >= 2 and spans_two_tables(related_tables)
             if is_m2m:
                 this, that = related_tables
                 this_field, that_field = this.field, that.field
-                this.field = f"{this.field}_set{self.field_counters[(that.table, this.field)] or ''}"
-                that.field = f"{that.field}_set{self.field_counters[(this.table, that.field)] or ''}"
-                self.field_counters[(this.table, that_field)] += 1
-                self.field_counters[(that.table, this_field)] += 1
+                this.field += '_set'
+                if (index := field_counters[that.table][this_field]):
+                    this.field += str(index)
+                that.field += '_set'
+                if (index := field_counters[this.table][that_field]):
+                    that.field += str(index)
+                field_counters[this.table][that_field] += 1
+                field_counters[that.table][this_field] += 1
                 for this, that in ((this, that), (that, this)):
+                    # the related tables may not be generated themselves (ignored tables, views)
+                    if this.table not in ret:
+                        continue
                     ret[this.table].rel_attrs.append(TRelAttr(name=that.field, table=that.table, cls='Set', reverse=this.field))
-                    self.relations_counters[(this.table, that.table)] += 1
-            for column_name, relation in ret[table_name].relations.items():
+                    relations_counters[this.table][that.table] += 1
+            for column_name, relation in relations.items():
                 att_name, kwargs, _notes = normalize_col_name(column_name, is_related=True)
-                index = self.field_counters[(table_name, att_name)]
-                self.field_counters[(table_name, att_name)] += 1
-                att_name = f"{att_name}{index or ''}"
+                index = table_counters[att_name]
+                table_counters[att_name] += 1
+                if index:
+                    att_name += str(index)
                 # getting reverse name
                 reverse = table_name.lower()
-                index = self.field_counters[(relation.table_ref, reverse)]
-                self.field_counters[(relation.table_ref, reverse)] += 1
-                reverse = f"{reverse}_set{index or ''}"
-                ret[table_name].rel_attrs += [TRelAttr(name=att_name, cls='Required', reverse=reverse, table=relation.table_ref, kwargs=kwargs),
-                                              TRelAttr(name=reverse, cls='Set', reverse=att_name, table=table_name)]
-                self.relations_counters[(table_name, relation.table_ref)] += 1
-                self.relations_counters[(relation.table_ref, table_name)] += 1
+                index = field_counters[relation.table_ref][reverse]
+                field_counters[relation.table_ref][reverse] += 1
+                reverse += '_set'
+                if index:
+                    reverse += str(index)
+                entry.rel_attrs += [TRelAttr(name=att_name, cls='Required', reverse=reverse, table=relation.table_ref, kwargs=kwargs),
+                                    TRelAttr(name=reverse, cls='Set', reverse=att_name, table=table_name)]
+                relations_counters[table_name][relation.table_ref] += 1
+                relations_counters[relation.table_ref][table_name] += 1
         return ret
 
-    def _get_output(self):
+    def _get_output(self, out: list[str]):
         db = import_from_string(self.database_import_str)
         with db_session():
-            connection = cast(Connection, db.get_connection())
-            Introspection = INROSPECTION_IMPL[db.provider.dialect.lower()]
-            introspection = Introspection(connection, provider=db.provider)
-            all_data = self._make_introspection(introspection)
-        yield 'db = Database()'
+            connection = cast('Connection', self.pool.getconn() if self.pool is not None else db.get_connection())
+            try:
+                IntrospectionImpl = get_introspection_impl(db.provider.dialect)
+                introspection = IntrospectionImpl(connection, provider=db.provider)
+                all_data = self._make_introspection(introspection)
+            finally:
+                if self.pool is not None:
+                    self.pool.putconn(connection)
+        # relations may point to tables that are not generated (e.g. ignored ones), so include their targets too
+        model_names = {table: str_to_py_identifier(table, case_type='title')
+                       for table in {*all_data, *(attr.table for data in all_data.values() for attr in data.rel_attrs)}}
+        kwargs_order, relations_counters, append = self.KWARGS_ORDER, self.relations_counters, out.append
+        append('db = Database()')
         for table_name, data in all_data.items():
-            model_name = str_to_py_identifier(table_name, case_type='title')
-            yield f'class {model_name}(db.Entity):'
-            yield f'    _table_ = "{table_name}"'
+            relations, primary_key_columns, unique_columns = data.relations, data.primary_key_columns, set(data.unique_columns)
+            single_primary_key = primary_key_columns[0] if len(primary_key_columns) == 1 else None
+            append(f'class {model_names[table_name]}(db.Entity):')
+            append(f'    _table_ = "{table_name}"')
             for row in data.description:
                 comment_notes: list[str] = []
-                extra_params: OrderedDict[str, str | bool | int] = OrderedDict()  # Holds Field parameters such as 'column'.
+                extra_params: dict[str, str | bool | int] = {}  # Holds Field parameters such as 'column'.
                 field_kwargs: dict[str, str | bool | int] = {}
-                if [row.name] == data.primary_key_columns:
+                if row.name == single_primary_key:
                     extra_params['primary_key'] = True
-                elif row.name in data.unique_columns:
+                elif row.name in unique_columns:
                     field_kwargs['unique'] = True
                 field_type = self.get_field_type(introspection, table_name, row)
-                if row.name not in data.relations:
+                if not (is_relation := row.name in relations):
                     extra_params.update(field_type.params)
                     field_kwargs.update(field_type.params)
                     comment_notes.extend(field_type.notes)
@@ -145,37 +209,38 @@ class Command:
                     continue
                 if row.null_ok:
                     extra_params['null'] = True
-                if row.name not in data.relations:
+                if not is_relation:
                     cls = 'PrimaryKey' if extra_params.get('primary_key') else 'Optional' if extra_params.get('null') else 'Required'
                     attr_name, kwargs, notes = normalize_col_name(row.name)
                     comment_notes += notes
                     field_kwargs.update(kwargs)
-                    ordered_kwargs = OrderedDict((key, repr(field_kwargs[key])) for key in self.KWARGS_ORDER if key in field_kwargs)
-                    if (kwargs_list := ', '.join(f'{key}={val}' for key, val in ordered_kwargs.items())):
-                        kwargs_list = f', {kwargs_list}'
-                    field_desc = f'{attr_name} = {cls}({field_type.type}{kwargs_list})'
+                    kwargs_list = ''.join(f', {key}={fast_repr(field_kwargs[key])}' for key in kwargs_order if key in field_kwargs)
                     if comment_notes:
-                        field_desc += '  # ' + " ".join(comment_notes)
-                    yield f'    {field_desc}'
+                        append(f'    {attr_name} = {cls}({field_type.type}{kwargs_list})  # {" ".join(comment_notes)}')
+                    else:
+                        append(f'    {attr_name} = {cls}({field_type.type}{kwargs_list})')
             for attr in data.rel_attrs:
-                model = str_to_py_identifier(attr.table, case_type='title')
-                if self.relations_counters[(table_name, attr.table)] > 1:
-                    attr.kwargs['reverse'] = attr.reverse
-                kwargs = [f'{key}={repr(val)}' for key, val in attr.kwargs.items()]
-                kwargs = ', '.join(kwargs)
-                kwargs = f', {kwargs}' if kwargs else ''
-                yield f'''    {attr.name} = {attr.cls}("{model}"{kwargs})'''
-            if len(data.primary_key_columns) > 1:
-                attrs = [c.lower() for c in data.primary_key_columns]
-                yield f"    PrimaryKey({', '.join(attrs)})"
+                model = model_names[attr.table]
+                # the normalized kwargs ('column') never contain 'reverse', so it is simply appended instead of merged into a copy
+                kwargs_list = ''.join(f', {key}={fast_repr(val)}' for key, val in attr.kwargs.items()) if attr.kwargs else ''
+                if relations_counters[table_name][attr.table] > 1:
+                    kwargs_list += f', reverse={fast_repr(attr.reverse)}'
+                append(f'    {attr.name} = {attr.cls}("{model}"{kwargs_list})')
+            if len(primary_key_columns) > 1:
+                append(f"    PrimaryKey({', '.join(c.lower() for c in primary_key_columns)})")
 
     def get_field_type(self, introspection: Introspection, table_name: str, row: FieldInfo):
         """
         Given the database connection, the table name, and the cursor row
         description, this routine will return the given field type name, as
         well as any additional keyword parameters and notes for the field.
+        The result only depends on the type related parts of the row, so it
+        is computed once per distinct type; callers must not mutate it.
         """
-        field_params: OrderedDict[str, str | int] = OrderedDict()
+        key = (row.type_code, row.internal_size, row.precision, row.scale, row.is_autoincrement)
+        if (cached := self._field_type_cache.get(key)) is not None:
+            return cached
+        field_params: dict[str, str | int] = {}
         field_notes: list[str] = []
         try:
             field_type, opts, import_str = introspection.get_field_type(row.type_code, row)
@@ -195,4 +260,5 @@ class Command:
                 field_notes.append('scale and/or precision have been guessed, as this database handles decimal fields as float')
             field_params['precision'] = row.precision if row.precision is not None else 10
             field_params['scale'] = row.scale if row.scale is not None else 5
-        return FieldType(type=field_type, params=field_params, notes=field_notes)
+        ret = self._field_type_cache[key] = FieldType(type=field_type, params=field_params, notes=field_notes)
+        return ret
@@ -1,57 +1,152 @@
+from __future__ import annotations
+
 from collections import defaultdict
-from typing import Any, DefaultDict, Iterable, cast
+from sys import intern
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, DefaultDict, Iterable, Iterator, cast
 
 from MySQLdb.constants import FIELD_TYPE
-from psycopg2.extensions import cursor as Cursor
+from MySQLdb.cursors import SSCursor
 from typing_extensions import override
 
 from .base import ColumnInfo, FieldInfo
 from .base import Introspection as BaseIntrospection
 from .base import TableInfo, TRelation
 
+if TYPE_CHECKING:
+    from psycopg2.extensions import cursor as Cursor
+
+
+# read-only module level tables, shared by every instance instead of being looked up through the class
+DATA_TYPES_REVERSE = MappingProxyType({FIELD_TYPE.BLOB: 'buffer',  # 'TextField',
+                                       FIELD_TYPE.CHAR: 'str',  # 'CharField',
+                                       FIELD_TYPE.DECIMAL: 'Decimal',  # 'DecimalField',
+                                       FIELD_TYPE.NEWDECIMAL: 'Decimal',  # 'DecimalField',
+                                       FIELD_TYPE.DATE: 'date',  # 'DateField',
+                                       FIELD_TYPE.DATETIME: 'datetime',  # 'DateTimeField',
+                                       FIELD_TYPE.DOUBLE: 'float',  # 'FloatField',
+                                       FIELD_TYPE.FLOAT: 'float',  # 'FloatField',
+                                       FIELD_TYPE.INT24: 'int',  # 'IntegerField',
+                                       FIELD_TYPE.LONG: 'int',  # 'IntegerField',
+                                       FIELD_TYPE.LONGLONG: 'int',  # 'BigIntegerField',
+                                       FIELD_TYPE.SHORT: 'int',  # 'SmallIntegerField',
+                                       FIELD_TYPE.STRING: 'str',  # 'CharField',
+                                       FIELD_TYPE.TIME: 'time',  # 'TimeField',
+                                       FIELD_TYPE.TIMESTAMP: 'time',  # 'DateTimeField',
+                                       FIELD_TYPE.TINY: 'int',  # 'IntegerField',
+                                       FIELD_TYPE.TINY_BLOB: 'str',  # 'TextField',
+                                       FIELD_TYPE.MEDIUM_BLOB: 'str',  # 'TextField',
+                                       FIELD_TYPE.LONG_BLOB: 'str',  # 'TextField',
+                                       FIELD_TYPE.VAR_STRING: 'str'})  # 'CharField',
+IMPORTS = MappingProxyType({'LongStr': 'from pony.orm.ormtypes import LongStr',
+                            'datetime': 'from datetime import datetime',
+                            'time': 'from datetime import time',
+                            'date': 'from datetime import date',
+                            'Decimal': 'from decimal import Decimal'})
+# builtin field types, which never need an import (and are what most columns map to)
+BUILTIN_FIELD_TYPES = ('int', 'str', 'float', 'buffer')
+# Type codes the server reports in cursor.description for every information_schema data type of MySQL, so that tables
+# don't need a "SELECT * LIMIT 0" probe. (TEXT and BLOB columns of every size are sent as BLOB, ENUM/SET as STRING.)
+# Only tables with types missing here (e.g. MariaDB extensions) still get probed.
+DATA_TYPE_CODES = MappingProxyType({'tinyint': FIELD_TYPE.TINY,
+                                    'smallint': FIELD_TYPE.SHORT,
+                                    'mediumint': FIELD_TYPE.INT24,
+                                    'int': FIELD_TYPE.LONG,
+                                    'bigint': FIELD_TYPE.LONGLONG,
+                                    'decimal': FIELD_TYPE.NEWDECIMAL,
+                                    'float': FIELD_TYPE.FLOAT,
+                                    'double': FIELD_TYPE.DOUBLE,
+                                    'bit': FIELD_TYPE.BIT,
+                                    'date': FIELD_TYPE.DATE,
+                                    'datetime': FIELD_TYPE.DATETIME,
+                                    'timestamp': FIELD_TYPE.TIMESTAMP,
+                                    'time': FIELD_TYPE.TIME,
+                                    'year': FIELD_TYPE.YEAR,
+                                    'char': FIELD_TYPE.STRING,
+                                    'varchar': FIELD_TYPE.VAR_STRING,
+                                    'binary': FIELD_TYPE.STRING,
+                                    'varbinary': FIELD_TYPE.VAR_STRING,
+                                    'enum': FIELD_TYPE.STRING,
+                                    'set': FIELD_TYPE.STRING,
+                                    'tinytext': FIELD_TYPE.BLOB,
+                                    'text': FIELD_TYPE.BLOB,
+                                    'mediumtext': FIELD_TYPE.BLOB,
+                                    'longtext': FIELD_TYPE.BLOB,
+                                    'tinyblob': FIELD_TYPE.BLOB,
+                                    'blob': FIELD_TYPE.BLOB,
+                                    'mediumblob': FIELD_TYPE.BLOB,
+                                    'longblob': FIELD_TYPE.BLOB,
+                                    'json': FIELD_TYPE.JSON,
+                                    'geometry': FIELD_TYPE.GEOMETRY,
+                                    'point': FIELD_TYPE.GEOMETRY,
+                                    'linestring': FIELD_TYPE.GEOMETRY,
+                                    'polygon': FIELD_TYPE.GEOMETRY,
+                                    'multipoint': FIELD_TYPE.GEOMETRY,
+                                    'multilinestring': FIELD_TYPE.GEOMETRY,
+                                    'multipolygon': FIELD_TYPE.GEOMETRY,
+                                    'geometrycollection': FIELD_TYPE.GEOMETRY,
+                                    'geomcollection': FIELD_TYPE.GEOMETRY})
+
+# template of the constraints created while collecting the key/index rows, see new_constraint
+EMPTY_CONSTRAINT: ColumnInfo = {'columns': [], 'primary_key': False, 'unique': False, 'check': False, 'index': True, 'foreign_key': None}
+
+# flags set on a constraint for each information_schema constraint_type (others leave the defaults)
+CONSTRAINT_KIND_FLAGS = {'PRIMARY KEY': ('primary_key', 'unique'), 'UNIQUE': ('unique',)}
+
+
+def new_constraint() -> ColumnInfo:
+    """ Return a fresh copy of EMPTY_CONSTRAINT, with its own columns list """
+    constraint = EMPTY_CONSTRAINT.copy()
+    constraint['columns'] = []
+    return constraint
+
 
 class Introspection(BaseIntrospection):
-    data_types_reverse = {FIELD_TYPE.BLOB: 'buffer',  # 'TextField',
-                          FIELD_TYPE.CHAR: 'str',  # 'CharField',
-                          FIELD_TYPE.DECIMAL: 'Decimal',  # 'DecimalField',
-                          FIELD_TYPE.NEWDECIMAL: 'Decimal',  # 'DecimalField',
-                          FIELD_TYPE.DATE: 'date',  # 'DateField',
-                          FIELD_TYPE.DATETIME: 'datetime',  # 'DateTimeField',
-                          FIELD_TYPE.DOUBLE: 'float',  # 'FloatField',
-                          FIELD_TYPE.FLOAT: 'float',  # 'FloatField',
-                          FIELD_TYPE.INT24: 'int',  # 'IntegerField',
-                          FIELD_TYPE.LONG: 'int',  # 'IntegerField',
-                          FIELD_TYPE.LONGLONG: 'int',  # 'BigIntegerField',
-                          FIELD_TYPE.SHORT: 'int',  # 'SmallIntegerField',
-                          FIELD_TYPE.STRING: 'str',  # 'CharField',
-                          FIELD_TYPE.TIME: 'time',  # 'TimeField',
-                          FIELD_TYPE.TIMESTAMP: 'time',  # 'DateTimeField',
-                          FIELD_TYPE.TINY: 'int',  # 'IntegerField',
-                          FIELD_TYPE.TINY_BLOB: 'str',  # 'TextField',
-                          FIELD_TYPE.MEDIUM_BLOB: 'str',  # 'TextField',
-                          FIELD_TYPE.LONG_BLOB: 'str',  # 'TextField',
-                          FIELD_TYPE.VAR_STRING: 'str'}  # 'CharField',
-    imports = {'LongStr': 'from pony.orm.ormtypes import LongStr',
-               'datetime': 'from datetime import datetime',
-               'time': 'from datetime import time',
-               'date': 'from datetime import date',
-               'Decimal': 'from decimal import Decimal'}
+    data_types_reverse = DATA_TYPES_REVERSE
+    imports = IMPORTS
+    data_type_codes = DATA_TYPE_CODES
+
+    def iter_rows(self, cursor: Cursor, query: str, params: list[Any], table_names: list[str]) -> Iterator[tuple[Any, ...]]:
+        """
+        Run a catalog query covering the given tables and iterate over its
+        rows. Large schemas are streamed from an unbuffered (server-side)
+        cursor in batches of `itersize` instead of materializing the whole
+        result set on the client; small ones use the given buffered cursor.
+        """
+        if len(table_names) < self.server_side_min_tables:
+            cursor.execute(query, params)
+            yield from cursor
+            return
+        # the rows of an unbuffered cursor must all be read before the connection can run another query
+        server_cursor = self.connection.cursor(SSCursor)
+        try:
+            server_cursor.execute(query, params)
+            while (rows := server_cursor.fetchmany(self.itersize)):
+                yield from rows
+        finally:
+            server_cursor.close()
 
     @override
     def get_field_type(self, data_type: int | str, description: FieldInfo) -> tuple[str, dict[str, int] | None, str | None]:
-        field_type, opts, _import = self.data_types_reverse[int(data_type)], None, None
-        assert _import is None
-        _import = self.imports.get(field_type)
-        if description.default and 'nextval' in description.default:
-            if field_type == 'int':
-                return 'AUTO', opts, _import
-        return field_type, opts, _import
+        field_type = DATA_TYPES_REVERSE[data_type if data_type.__class__ is int else int(data_type)]
+        _import = None if field_type in BUILTIN_FIELD_TYPES else IMPORTS.get(field_type)
+        if description.is_autoincrement and field_type == 'int':
+            return 'AUTO', None, _import
+        return field_type, None, _import
 
     @override
     def get_table_list(self, cursor: Cursor):
         """Return a list of table and view names in the current database."""
         cursor.execute("SHOW FULL TABLES")
-        return [TableInfo(row[0], {'BASE TABLE': 't', 'VIEW': 'v'}[row[1]]) for row in cursor.fetchall()]
+        return [TableInfo(row[0], {'BASE TABLE': 't', 'VIEW': 'v'}[row[1]]) for row in cursor]
+
+    def tables_to_warm(self, cursor: Cursor, table_name: str) -> list[str]:
+        """
+        Return the tables to introspect on a per-table cache miss: the
+        requested one and every other table of the database, so that a single
+        bulk query warms the cache for all the subsequent per-table calls.
+        """
+        return list(dict.fromkeys([table_name, *self.table_names(cursor, include_views=True)]))
 
     @override
     def get_table_description(self, cursor: Cursor, table_name: str):
@@ -59,41 +154,91 @@ class Introspection(BaseIntrospection):
         Return a description of the table with the DB-API cursor.description
         interface."
         """
+        if table_name not in self._descriptions_cache:
+            self.get_all_table_descriptions(cursor, self.tables_to_warm(cursor, table_name))
+        return self._descriptions_cache.get(table_name, [])
+
+    @override
+    def get_all_table_descriptions(self, cursor: Cursor, table_names: list[str]) -> dict[str, list[FieldInfo]]:
+        """
+        Return a description of every given table with the DB-API
+        cursor.description interface. Tables whose data types all have a known
+        type code are described from information_schema alone, without reading
+        cursor.description: their display_size is left unset, and internal_size,
+        precision and scale are None wherever information_schema has no value
+        for them (the probed tables fall back to cursor.description there).
+        """
+        if not table_names:
+            return {}
+        placeholders = ', '.join(['%s'] * len(table_names))
         # information_schema database gives more accurate results for some figures:
         # - varchar length returned by cursor.description is an internal length,
         #   not visible length (#5725)
         # - precision and scale (for decimal fields) (#5014)
         # - auto_increment is not available in cursor.description
-        cursor.execute("""
+        rows = self.iter_rows(cursor, f"""
             SELECT
-                column_name, data_type, character_maximum_length,
+                table_name, column_name, data_type, character_maximum_length,
                 numeric_precision, numeric_scale, extra, column_default,
                 CASE
                     WHEN column_type LIKE '%% unsigned' THEN 1
                     ELSE 0
-                END AS is_unsigned
+                END AS is_unsigned,
+                is_nullable
             FROM information_schema.columns
-            WHERE table_name = %s AND table_schema = DATABASE()""", [table_name])
-        field_info = {line[0]: line for line in cursor.fetchall()}
+            WHERE table_name IN ({placeholders}) AND table_schema = DATABASE()
+            ORDER BY table_name, ordinal_position""", table_names, table_names)
+        field_infos: dict[str, dict[str, Any]] = {table_name: {} for table_name in table_names}
+        # the same column names ('id', 'created_at', ...) repeat across tables and queries, so they are interned to share
+        # a single string, which also turns the later lookups by name into identity comparisons
+        for line in rows:
+            field_infos[line[0]][intern(line[1])] = line[1:]
         quote_name = self.provider.quote_name
-        cursor.execute("SELECT * FROM %s LIMIT 1" % quote_name(table_name))
-
-        def to_int(i: int | None):
-            return int(i) if i is not None else i
-        fields: list[FieldInfo] = []
-        for line in cast(Any, cursor.description):
-            col_name = cast(str, line[0])
-            fields.append(FieldInfo(name=col_name,
-                                    type_code=line[1],
-                                    display_size=line[2],
-                                    internal_size=to_int(field_info[col_name][2]) or line[3],
-                                    precision=to_int(field_info[col_name][3]) or line[4],
-                                    scale=to_int(field_info[col_name][4]) or line[5],
-                                    null_ok=line[6],
-                                    default=field_info[col_name][6],
-                                    extra=field_info[col_name][5],
-                                    is_unsigned=field_info[col_name][7]))
-        return fields
+
+        def probe(cursor: Cursor, table_name: str) -> list[FieldInfo]:
+            field_info = field_infos[table_name]
+            description: list[FieldInfo] = []
+            # LIMIT 0 still fills cursor.description, without reading any row
+            cursor.execute("SELECT * FROM %s LIMIT 0" % quote_name(table_name))
+            for col_name, type_code, display_size, internal_size, precision, scale, null_ok in cast(Any, cursor.description):
+                _, _, max_len, num_precision, num_scale, extra, default, is_unsigned, _ = field_info[col_name]
+                description.append(FieldInfo(name=intern(col_name),
+                                             type_code=type_code,
+                                             display_size=display_size,
+                                             internal_size=(int(max_len) or internal_size) if max_len is not None else internal_size,
+                                             precision=(int(num_precision) or precision) if num_precision is not None else precision,
+                                             scale=(int(num_scale) or scale) if num_scale is not None else scale,
+                                             null_ok=null_ok,
+                                             default=default,
+                                             extra=extra,
+                                             is_unsigned=is_unsigned,
+                                             is_autoincrement=extra == 'auto_increment'))
+            return description
+        data_type_codes = DATA_TYPE_CODES
+        descriptions: dict[str, list[FieldInfo]] = {}
+        probed_tables: list[str] = []
+        for table_name, field_info in field_infos.items():
+            if not (field_info and all(info[1] in data_type_codes for info in field_info.values())):
+                probed_tables.append(table_name)
+                continue
+            # the type codes are known, so the table isn't probed. the sizes cursor.description would add are left unset (see above)
+            descriptions[table_name] = [FieldInfo(name=col_name,
+                                                  type_code=data_type_codes[data_type],
+                                                  internal_size=int(max_len) if max_len is not None else None,
+                                                  precision=int(num_precision) if num_precision is not None else None,
+                                                  scale=int(num_scale) if num_scale is not None else None,
+                                                  null_ok=is_nullable == 'YES',
+                                                  default=default,
+                                                  extra=extra,
+                                                  is_unsigned=is_unsigned,
+                                                  is_autoincrement=extra == 'auto_increment')
+                                        for col_name, (_, data_type, max_len, num_precision, num_scale, extra, default, is_unsigned, is_nullable)
+                                        in field_info.items()]
+        # the remaining probes are independent round-trips, so they are spread over the worker threads
+        descriptions.update(self.map_tables(cursor, probe, probed_tables))
+        descriptions = {table_name: descriptions[table_name] for table_name in field_infos}
+        self._descriptions_cache.update(descriptions)
+        return descriptions
 
     @override
     def get_relations(self, cursor: Cursor, table_name: str):
@@ -101,22 +246,40 @@ class Introspection(BaseIntrospection):
         Return a dictionary of {field_name: (field_name_other_table, other_table)}
         representing all relationships to the given table.
         """
-        return {column_fieldname: TRelation(field_ref, table_ref) for column_fieldname, table_ref, field_ref in self.get_key_columns(cursor, table_name)}
+        if table_name not in self._relations_cache:
+            self.get_all_relations(cursor, self.tables_to_warm(cursor, table_name))
+        return self._relations_cache.get(table_name, {})
 
     @override
-    def get_key_columns(self, cursor: Cursor, table_name: str):
+    def get_all_relations(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, TRelation]]:
         """
-        Return a list of (column_name, referenced_table_name, referenced_column_name)
-        for all key columns in the given table.
+        Return a dictionary of {table_name: relations} for all given tables in
+        a single query.
         """
-        cursor.execute("""
-            SELECT column_name, referenced_table_name, referenced_column_name
+        if not table_names:
+            return {}
+        placeholders = ', '.join(['%s'] * len(table_names))
+        rows = self.iter_rows(cursor, f"""
+            SELECT table_name, column_name, referenced_table_name, referenced_column_name
             FROM information_schema.key_column_usage
-            WHERE table_name = %s
+            WHERE table_name IN ({placeholders})
                 AND table_schema = DATABASE()
                 AND referenced_table_name IS NOT NULL
-                AND referenced_column_name IS NOT NULL""", [table_name])
-        return cast(list[tuple[str, str, str]], cursor.fetchall())
+                AND referenced_column_name IS NOT NULL
+            ORDER BY table_name, ordinal_position""", table_names, table_names)
+        relations: dict[str, dict[str, TRelation]] = {table_name: {} for table_name in table_names}
+        for table_name, column_fieldname, table_ref, field_ref in cast(Iterable[tuple[str, str, str, str]], rows):
+            relations[table_name][intern(column_fieldname)] = TRelation(intern(field_ref), table_ref)
+        self._relations_cache.update(relations)
+        return relations
+
+    @override
+    def get_key_columns(self, cursor: Cursor, table_name: str):
+        """
+        Return a list of (column_name, referenced_table_name, referenced_column_name)
+        for all key columns in the given table.
+        """
+        return [(column_name, relation.table_ref, relation.field_name_ref) for column_name, relation in self.get_relations(cursor, table_name).items()]
 
     @override
     def get_constraints(self, cursor: Cursor, table_name: str) -> dict[str, ColumnInfo]:
@@ -124,38 +287,51 @@ class Introspection(BaseIntrospection):
         Retrieve any constraints or keys (unique, pk, fk, check, index) across
         one or more columns.
         """
-        quote_name = self.provider.quote_name
-        constraints: DefaultDict[str, ColumnInfo] = defaultdict(lambda: {'columns': [],
-                                                                         'primary_key': False,
-                                                                         'unique': False,
-                                                                         'check': False,
-                                                                         'index': True,
-                                                                         'foreign_key': None})
-        # Get the actual constraint names and columns
-        cursor.execute("""
-            SELECT kc.`constraint_name`, kc.`column_name`, kc.`referenced_table_name`, kc.`referenced_column_name`
+        if table_name not in self._constraints_cache:
+            self.get_all_constraints(cursor, self.tables_to_warm(cursor, table_name))
+        return self._constraints_cache.get(table_name, {})
+
+    @override
+    def get_all_constraints(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, ColumnInfo]]:
+        """
+        Retrieve the constraints of every given table, querying
+        information_schema once per kind of constraint data.
+        """
+        if not table_names:
+            return {}
+        placeholders = ', '.join(['%s'] * len(table_names))
+        all_constraints: dict[str, DefaultDict[str, ColumnInfo]] = {table_name: defaultdict(new_constraint) for table_name in table_names}
+        # Get the constraint names, types and columns. Every key_column_usage row belongs to a table_constraints
+        # row, and the primary/unique constraints always have key columns, so a single join covers both.
+        rows = self.iter_rows(cursor, f"""
+            SELECT kc.`table_name`, kc.`constraint_name`, tc.`constraint_type`, kc.`column_name`,
+                kc.`referenced_table_name`, kc.`referenced_column_name`
             FROM information_schema.key_column_usage AS kc
-            WHERE kc.table_schema = DATABASE() AND kc.table_name = %s
-        """, [table_name])
-        for constraint, column, ref_table, ref_column in cursor.fetchall():
-            constraints[constraint]['foreign_key'] = (ref_table, ref_column) if ref_column else None
-            constraints[constraint]['columns'].append(column)
-        # Now get the constraint types
-        cursor.execute("""
-            SELECT c.constraint_name, c.constraint_type
-            FROM information_schema.table_constraints AS c
-            WHERE c.table_schema = DATABASE() AND c.table_name = %s
-        """, [table_name])
-        for constraint, kind in cast(Iterable[tuple[str, str]], cursor.fetchall()):
-            if kind.lower() == "primary key":
-                constraints[constraint]['primary_key'] = True
-                constraints[constraint]['unique'] = True
-            elif kind.lower() == "unique":
-                constraints[constraint]['unique'] = True
-        # Now add in the indexes
-        cursor.execute("SHOW INDEX FROM %s", [quote_name(table_name)])
-        for _table, _non_unique, index, _colseq, column, _type_ in [x[:5] + (x[10],) for x in cursor.fetchall()]:
-            constraints[index]['index'] = True
-            # constraints[index]['type'] = Index.suffix if type_ == 'BTREE' else type_.lower()
-            constraints[index]['columns'].append(column)
-        return constraints
+            JOIN information_schema.table_constraints AS tc
+                ON tc.table_schema = kc.table_schema
+                    AND tc.table_name = kc.table_name
+                    AND tc.constraint_name = kc.constraint_name
+            WHERE kc.table_schema = DATABASE() AND kc.table_name IN ({placeholders})
+            ORDER BY kc.table_name, kc.constraint_name, kc.ordinal_position
+        """, table_names, table_names)
+        for table_name, constraint, kind, column, ref_table, ref_column in rows:
+            constraint_info = all_constraints[table_name][constraint]
+            # the reference of the last column wins for the multi-column foreign keys, the kind only needs setting once
+            constraint_info['foreign_key'] = (ref_table, ref_column) if ref_column else None
+            if (columns := constraint_info['columns']) == []:
+                for flag in CONSTRAINT_KIND_FLAGS.get(kind.upper(), ()):
+                    constraint_info[flag] = True  # type: ignore[literal-required]
+            columns.append(intern(column))
+        # Now add in the indexes, straight from information_schema instead of a SHOW INDEX per table
+        rows = self.iter_rows(cursor, f"""
+            SELECT s.table_name, s.index_name, s.column_name
+            FROM information_schema.statistics AS s
+            WHERE s.table_schema = DATABASE() AND s.table_name IN ({placeholders})
+            ORDER BY s.table_name, s.index_name, s.seq_in_index
+        """, table_names, table_names)
+        for table_name, index, column in cast(Iterable[tuple[str, str, str]], rows):
+            constraint_info = all_constraints[table_name][index]
+            constraint_info['index'] = True
+            constraint_info['columns'].append(intern(column))
+        self._constraints_cache.update({table_name: dict(constraints) for table_name, constraints in all_constraints.items()})
+        return {table_name: self._constraints_cache[table_name] for table_name in table_names}
@@ -1,37 +1,19 @@
 import ast
-import typing as t
 from ast import (AST, AnnAssign, Assign, Attribute, Call, ClassDef, Constant,
                  Expr, FunctionDef, Module, Name, Return, arg, arguments,
                  keyword, unparse)
 from collections import defaultdict
-from itertools import chain
+from functools import cache
+from itertools import chain, groupby
 from keyword import iskeyword
+from operator import attrgetter
 from pathlib import Path
 from typing import Iterable, cast
 
-import inflection
 from pony.orm import (Database, Optional, PrimaryKey, Required, Set,
                       db_session, select)
-from slugify import slugify
-
-
-def str_to_py_identifier(input_string: str, *, case_type: t.Literal['snake', 'camel', 'title', 'const'] = 'snake'):
-    sanitized_string = slugify(input_string, separator='_').replace('.', '_')
-    if not sanitized_string or not sanitized_string[0].isalpha():
-        sanitized_string = f"_{''.join(filter(str.isalnum, sanitized_string))}"
-    if iskeyword(sanitized_string):
-        sanitized_string = f"{sanitized_string}_"
-    match case_type:
-        case 'snake':
-            return inflection.underscore(sanitized_string)
-        case 'camel':
-            return inflection.camelize(sanitized_string, False)
-        case 'title':
-            has_leading_underscore = '_' if sanitized_string.startswith('_') else ''
-            title_cased = ''.join(word.capitalize() for word in sanitized_string.split('_'))
-            return has_leading_underscore + title_cased
-        case 'const':
-            return inflection.underscore(sanitized_string).upper()
+
+from src.sanitize_column_name import str_to_py_identifier
 
 
 PG_TO_PY_TYPE_MAP = {'integer': 'int',
@@ -79,6 +61,15 @@ PY_ARRAY_TYPE_TO_PONY = {
     'str': 'StrArray',
 }
 
+# data types that aren't mapped through PG_TO_PY_TYPE_MAP, so each column needs a single lookup to pick its branch
+PG_SPECIAL_TYPE_KINDS = {
+    'USER-DEFINED': 'enum',
+    'ARRAY': 'array',
+    'array': 'array',
+    'json': 'json',
+    'jsonb': 'json',
+}
+
 db = Database()
 
 
@@ -138,6 +129,7 @@ class InformationSchemaColumns(db.Entity):
     table_schema = Required(str)
     table_name = Required(str)
     column_name = Required(str)
+    ordinal_position = Required(int)
     data_type = Required(str)
     is_nullable = Required(str)
     column_default = Optional(str, nullable=True)
@@ -157,12 +149,35 @@ class InformationSchemaColumns(db.Entity):
     PrimaryKey(table_schema, table_name, column_name)
 
 
+# pony types that take a precision option
+PRECISION_TYPES = frozenset({"Decimal", "time", "timedelta", "datetime"})
+
+# the (self) signature of every generated to_gql_type method. unparse doesn't modify the tree, so one node is shared by all of them
+SELF_ARGUMENTS = arguments(posonlyargs=[],
+                           args=[arg(arg='self', annotation=None, type_comment=None)],
+                           vararg=None,
+                           kwonlyargs=[],
+                           kw_defaults=[],
+                           kwarg=None,
+                           defaults=[])
+# likewise for the decorators and base class of the generated enums and gql types
+STRAWBERRY_ENUM = Attribute(value=Name(id='strawberry'), attr='enum')
+STRAWBERRY_TYPE = Attribute(value=Name(id='strawberry'), attr='type')
+ENUM_BASE = Name(id='Enum')
+
+
+@cache
+def shared_name(id: str) -> Name:
+    """Return a Name node shared by every use of the id, as the wrappers, types and annotations repeat for each column"""
+    return Name(id=id)
+
+
 def create_enum_ast(name: str, values: Iterable[str]):
     trimmed_name = "e_" + "_".join(name.split("_")[:-1])
     enum_name = str_to_py_identifier(trimmed_name, case_type='title')
     return ClassDef(name=enum_name,
-                    decorator_list=[Attribute(value=Name(id='strawberry'), attr='enum')],
-                    bases=[Name(id='Enum')],
+                    decorator_list=[STRAWBERRY_ENUM],
+                    bases=[ENUM_BASE],
                     keywords=[],
                     body=[Assign(targets=[Name(id=str_to_py_identifier(enum_value, case_type='const'))],
                                  value=Constant(value=(enum_value), kind=None),
@@ -170,79 +185,95 @@ def create_enum_ast(name: str, values: Iterable[str]):
                                  type_comment=None) for enum_value in values])
 
 
-def get_table_asts(table_name: str, columns: list[InformationSchemaColumns]) -> list[AST]:
+def get_constraint_map(table_schema: str) -> dict[tuple[str, str], list[str]]:
+    """Fetch the constraint types of every key column of the schema at once, keyed by (table_name, column_name)"""
+    constraint_map: dict[tuple[str, str], list[str]] = defaultdict(list)
+    # raw sql, as the query runs once and doesn't need pony's query translation
+    for table_name, column_name, constraint_type in db.select("""SELECT DISTINCT kcu.table_name, kcu.column_name, tc.constraint_type
+            FROM information_schema.key_column_usage kcu
+            JOIN information_schema.table_constraints tc USING (constraint_name)
+            WHERE kcu.table_schema = $table_schema"""):
+        constraint_map[table_name, column_name].append(constraint_type)
+    return constraint_map
+
+
+def get_enum_map() -> dict[str, list[str]]:
+    """Fetch the labels of every enum type at once, keyed by the type name"""
+    enum_map: dict[str, list[str]] = defaultdict(list)
+    for typname, enumlabel in db.select("""SELECT DISTINCT t.typname, e.enumlabel
+            FROM pg_type t
+            JOIN pg_enum e ON e.enumtypid = t.oid
+            WHERE t.typtype = 'e'"""):
+        enum_map[typname].append(enumlabel)
+    return enum_map
+
+
+def get_table_asts(table_name: str,
+                   columns: list[InformationSchemaColumns],
+                   constraint_map: dict[tuple[str, str], list[str]],
+                   enum_map: dict[str, list[str]]) -> list[AST]:
     pony_model_body: list[Expr | Assign | FunctionDef] = [Assign(targets=[Name(id="_table_")], value=Constant(value=table_name), lineno=None, simple=1)]
     enums: list[ClassDef] = []
     primary_keys: list[str] = []
     unique_keys: list[str] = []
     gql_type_body: list[AnnAssign] = []
     for col in columns:
-        for constraint_type in select(tc.constraint_type for kcu in InformationSchemaKeyColumnUsage
-                                      for tc in InformationSchemaTableConstraints if
-                                      tc.constraint_name == kcu.constraint_name and
-                                      kcu.table_name == col.table_name and
-                                      kcu.table_schema == col.table_schema and
-                                      kcu.column_name == col.column_name):
+        for constraint_type in constraint_map.get((col.table_name, col.column_name), ()):
             if constraint_type == "PRIMARY KEY":
                 primary_keys.append(col.column_name)
             elif constraint_type == "UNIQUE":
                 unique_keys.append(col.column_name)
+    # computed once per table, so that the per-column checks below are constant time
+    single_primary_key = primary_keys[0] if len(primary_keys) == 1 else None
+    unique_key_set = set(unique_keys)
     for col in columns:
-        if col.data_type == "USER-DEFINED":
-            pony_assign_type = 'str'
-            gql_assign_type = 'str'
-            enum_data: dict[str, list[str]] = defaultdict(list)
-            for typname, enumlabel in select((t.typname, e.enumlabel) for t in PgType for e in PgEnum
-                                             if t.typtype == 'e' and t.typname == col.udt_name and e.enumtypid == t):
-                enum_data[typname].append(enumlabel)
-            assert enum_data
-            enums.append(create_enum_ast(col.udt_name.replace(table_name, ""), enum_data[col.udt_name]))
-        elif col.data_type in ["ARRAY", "array"]:
-            py_type = PG_ARRAY_TYPE_TO_PY[col.udt_name]
-            pony_assign_type = PY_ARRAY_TYPE_TO_PONY[py_type]
-            gql_assign_type = f"list[{py_type}]"
-        elif col.data_type in ["json", "jsonb"]:
-            pony_assign_type = "Json"
-            gql_assign_type = "dict[str, Any]"
-        else:
-            py_type = PG_TO_PY_TYPE_MAP[col.data_type]
-            pony_assign_type = py_type
-            gql_assign_type = py_type
-        match (len(primary_keys), col.column_name in primary_keys, col.is_nullable):
-            case (1, True, _):
+        match PG_SPECIAL_TYPE_KINDS.get(col.data_type):
+            case 'enum':
+                pony_assign_type = 'str'
+                gql_assign_type = 'str'
+                labels = enum_map.get(col.udt_name)
+                assert labels
+                enums.append(create_enum_ast(col.udt_name.replace(table_name, ""), labels))
+            case 'array':
+                py_type = PG_ARRAY_TYPE_TO_PY[col.udt_name]
+                pony_assign_type = PY_ARRAY_TYPE_TO_PONY[py_type]
+                gql_assign_type = f"list[{py_type}]"
+            case 'json':
+                pony_assign_type = "Json"
+                gql_assign_type = "dict[str, Any]"
+            case _:
+                py_type = PG_TO_PY_TYPE_MAP[col.data_type]
+                pony_assign_type = py_type
+                gql_assign_type = py_type
+        match (col.column_name == single_primary_key, col.is_nullable):
+            case (True, _):
                 pony_col_wrapper = 'PrimaryKey'
-            case (_, _, "NO"):
+            case (_, "NO"):
                 pony_col_wrapper = 'Required'
             case _:
                 pony_col_wrapper = 'Optional'
                 gql_assign_type += "|None"
-        keyword_dict = {'column': col.column_name,
-                        'sql_default': col.column_default,
-                        "nullable": col.is_nullable == "YES",
-                        'max_len': col.character_maximum_length,
-                        'precision': col.numeric_precision if pony_assign_type in ["Decimal", "time", "timedelta", "datetime"] else None,
-                        'scale': col.numeric_scale if pony_assign_type == "Decimal" else None,
-                        'unique': True if col.column_name in unique_keys else None}
-        keyword_asts = [keyword(arg=arg, value=Constant(value=value)) for arg, value in keyword_dict.items() if value is not None]
+        keyword_pairs = (('column', col.column_name),
+                         ('sql_default', col.column_default),
+                         ("nullable", col.is_nullable == "YES"),
+                         ('max_len', col.character_maximum_length),
+                         ('precision', col.numeric_precision if pony_assign_type in PRECISION_TYPES else None),
+                         ('scale', col.numeric_scale if pony_assign_type == "Decimal" else None),
+                         ('unique', True if col.column_name in unique_key_set else None))
+        keyword_asts = [keyword(arg=arg, value=Constant(value=value)) for arg, value in keyword_pairs if value is not None]
         santiized_column_name = col.column_name + ("_"if iskeyword(col.column_name) else "")
         pony_model_body.append(Assign(targets=[Name(id=santiized_column_name)],
-                                      value=Call(func=Name(id=pony_col_wrapper),
-                                                 args=[Name(id=pony_assign_type)],
+                                      value=Call(func=shared_name(pony_col_wrapper),
+                                                 args=[shared_name(pony_assign_type)],
                                                  keywords=keyword_asts),
                                       lineno=None, simple=1))
-        gql_type_body.append(AnnAssign(target=Name(id=santiized_column_name), annotation=Name(id=gql_assign_type), value=None, simple=1))
+        gql_type_body.append(AnnAssign(target=Name(id=santiized_column_name), annotation=shared_name(gql_assign_type), value=None, simple=1))
     if len(primary_keys) > 1:
         pony_model_body.append(Expr(value=Call(func=Name(id='PrimaryKey'), args=[Name(id=key) for key in primary_keys], keywords=[])))
     pony_class_name = str_to_py_identifier(table_name, case_type='title')
     gql_class_name = pony_class_name + "Type"
     pony_model_body.append(FunctionDef(name='to_gql_type',
-                                       args=arguments(posonlyargs=[],
-                                                      args=[arg(arg='self', annotation=None, type_comment=None)],
-                                                      vararg=None,
-                                                      kwonlyargs=[],
-                                                      kw_defaults=[],
-                                                      kwarg=None,
-                                                      defaults=[]),
+                                       args=SELF_ARGUMENTS,
                                        body=[Return(value=Call(func=Name(id=gql_class_name),
                                                                args=[],
                                                                keywords=[keyword(arg=None,
@@ -255,7 +286,7 @@ def get_table_asts(table_name: str, columns: list[InformationSchemaColumns]) ->
                                        type_comment=None))
     return [*enums,
             ClassDef(name=gql_class_name,
-                     decorator_list=[Attribute(value=Name(id='strawberry'), attr='type')],
+                     decorator_list=[STRAWBERRY_TYPE],
                      bases=[],
                      keywords=[],
                      body=[gql_type_body]),
@@ -272,19 +303,26 @@ from typing import Any
 from decimal import Decimal
 from datetime import datetime, date, time, timedelta
 from enum import Enum
-from pony.orm import Database, PrimaryKey, Json, Optional, PrimaryKey, Required, Set, composite_key, LongStr, Json, IntArray, StrArray, FloatArray
+from pony.orm import Database, PrimaryKey, Json, Optional, Required, Set, composite_key, LongStr, IntArray, StrArray, FloatArray
 db = Database()
 """
 
 
 @db_session
 def generate_pony_orm_model_ast(filepath: Path):
-    table_to_columns: dict[str, list[InformationSchemaColumns]] = defaultdict(list)
-    for col in select(c for c in InformationSchemaColumns if c.table_schema == 'public'):
-        table_to_columns[col.table_name].append(col)
-    tables = chain.from_iterable(get_table_asts(table_name, columns) for table_name, columns in table_to_columns.items())
-    models_module = Module(type_ignores=[], body=ast.parse(DEFAULT_IMPORTS).body + list(tables))
+    # sorted by the server, so the columns of each table come in a row and in their declaration order
+    columns = select(c for c in InformationSchemaColumns if c.table_schema == 'public').order_by(InformationSchemaColumns.table_name,
+                                                                                                 InformationSchemaColumns.ordinal_position)
+    # one catalog query for the key columns of all tables and one for all the enum labels, instead of one per column
+    constraint_map = get_constraint_map('public')
+    enum_map = get_enum_map()
+    tables = chain.from_iterable(get_table_asts(table_name, list(table_columns), constraint_map, enum_map)
+                                 for table_name, table_columns in groupby(columns, key=attrgetter('table_name')))
     # models_module: Module = ImportConsolidator().traverse(models_module)
     # models_module: Module = DedupNodes().traverse(models_module)
     with filepath.joinpath("pony_models.py").open("w") as file:
-        _ = file.write(unparse(models_module))
+        _ = file.write(unparse(Module(type_ignores=[], body=ast.parse(DEFAULT_IMPORTS).body)))
+        # the classes are unparsed and written one by one as they are generated, so only one table's worth of ast is kept
+        # in memory. unparse separates top level classes by a blank line, so the output is the same as for a whole module
+        for node in tables:
+            _ = file.write("\n\n" + unparse(node))
@@ -1,4 +1,5 @@
-from typing import cast
+from itertools import count
+from typing import Any, ClassVar, Iterator, cast
 
 from psycopg2.extensions import cursor as Cursor
 from typing_extensions import override
@@ -7,6 +8,8 @@ from .base import ColumnInfo, FieldInfo
 from .base import Introspection as BaseIntrospection
 from .base import TableInfo, TRelation
 
+NUMERIC_OID = 1700
+
 
 class Introspection(BaseIntrospection):
     # Maps type codes to Pony attr types.
@@ -34,15 +37,32 @@ class Introspection(BaseIntrospection):
                'time': 'from datetime import time',
                'date': 'from datetime import date',
                'Decimal': 'from decimal import Decimal'}
-    ignored_tables = []
+    ignored_tables = frozenset()
+    cursor_names: ClassVar[Iterator[int]] = count()
+
+    def iter_rows(self, cursor: Cursor, query: str, params: list[Any], table_names: list[str]) -> Iterator[tuple[Any, ...]]:
+        """
+        Run a catalog query covering the given tables and iterate over its
+        rows. Large schemas are streamed from a server-side (named) cursor in
+        batches of `itersize` instead of materializing the whole result set on
+        the client; small ones use the given client-side cursor.
+        """
+        if len(table_names) < self.server_side_min_tables:
+            cursor.execute(query, params)
+            yield from cursor
+            return
+        # withhold is required for named cursors when the connection is in autocommit mode
+        with self.connection.cursor(name=f'pony_gen_{next(self.cursor_names)}', withhold=True) as server_cursor:
+            server_cursor.itersize = self.itersize
+            server_cursor.execute(query, params)
+            yield from server_cursor
 
     @override
     def get_field_type(self, data_type: int | str, description: FieldInfo) -> tuple[str, dict[str, int] | None, str | None]:
         field_type, opts = self.data_types_reverse[int(data_type)], None
         _import = self.imports.get(field_type)
-        if description.default and 'nextval' in description.default:
-            if field_type == 'int':
-                return 'AUTO', opts, _import
+        if description.is_autoincrement and field_type == 'int':
+            return 'AUTO', opts, _import
         return field_type, opts, _import
 
     @override
@@ -55,7 +75,7 @@ class Introspection(BaseIntrospection):
             WHERE c.relkind IN ('r', 'v')
                 AND n.nspname NOT IN ('pg_catalog', 'pg_toast')
                 AND pg_catalog.pg_table_is_visible(c.oid)""")
-        return [TableInfo(row[0], {'r': 't', 'v': 'v'}[row[1]]) for row in cursor.fetchall() if row[0] not in self.ignored_tables]
+        return [TableInfo(row[0], {'r': 't', 'v': 'v'}[row[1]]) for row in cursor if row[0] not in self.ignored_tables]
 
     @override
     def get_table_description(self, cursor: Cursor, table_name: str) -> list[FieldInfo]:
@@ -63,21 +83,49 @@ class Introspection(BaseIntrospection):
         Return a description of the table with the DB-API cursor.description
         interface.
         """
-        # As cursor.description does not return reliably the nullable property,
-        # we have to query the information_schema (#7783)
-        cursor.execute("""SELECT column_name, is_nullable, column_default
-                            FROM information_schema.columns
-                            WHERE table_name = %s""", [table_name])
-        field_map: dict[str, tuple[str, ...]] = {line[0]: line[1:] for line in cursor.fetchall()}
-        cursor.execute("SELECT * FROM %s LIMIT 1" % self.provider.quote_name(table_name))
-        return [FieldInfo(display_size=line.display_size,
-                          internal_size=line.internal_size,
-                          name=line.name,
-                          null_ok=field_map[line.name][0] == 'YES',
-                          precision=line.precision,
-                          scale=line.scale,
-                          type_code=line.type_code,
-                          default=field_map[line.name][1]) for line in cursor.description] if cursor.description is not None else []
+        return self.get_all_table_descriptions(cursor, [table_name]).get(table_name, [])
+
+    @override
+    def get_all_table_descriptions(self, cursor: Cursor, table_names: list[str]) -> dict[str, list[FieldInfo]]:
+        """
+        Return a description of every given table with the DB-API
+        cursor.description interface.
+        """
+        # Everything cursor.description would report is read from the catalog for all tables at once, instead of
+        # probing each table with a "SELECT * LIMIT 0" round-trip. Like the server does in its row descriptions,
+        # domain columns are reported with the type and typmod of their base type. The nullable property comes
+        # from the catalog too, as cursor.description does not return it reliably (#7783).
+        rows = self.iter_rows(cursor, """
+            SELECT
+                c.relname, a.attname,
+                CASE WHEN t.typbasetype <> 0 THEN t.typbasetype ELSE a.atttypid END,
+                a.attlen,
+                CASE WHEN t.typbasetype <> 0 THEN t.typtypmod ELSE a.atttypmod END,
+                NOT (a.attnotnull OR t.typnotnull),
+                pg_get_expr(d.adbin, d.adrelid)
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            JOIN pg_namespace ns ON ns.oid = c.relnamespace
+            JOIN pg_type t ON t.oid = a.atttypid
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE ns.nspname = current_schema()
+                AND c.relname = ANY(%s)
+                AND a.attnum > 0
+                AND NOT a.attisdropped
+            ORDER BY c.relname, a.attnum""", [table_names], table_names)
+        descriptions: dict[str, list[FieldInfo]] = {table_name: [] for table_name in table_names}
+        for table_name, column_name, type_code, length, typmod, null_ok, default in rows:
+            # sizes are derived from the type modifier the same way psycopg2 fills cursor.description
+            modifier = typmod - 4 if typmod > 0 else typmod
+            is_numeric = type_code == NUMERIC_OID
+            descriptions[table_name].append(FieldInfo(name=column_name,
+                                                      type_code=type_code,
+                                                      internal_size=length if length != -1 else (modifier >> 16) & 0xFFFF if is_numeric else modifier,
+                                                      precision=(modifier >> 16) & 0xFFFF if is_numeric else None,
+                                                      scale=modifier & 0xFFFF if is_numeric else None,
+                                                      null_ok=null_ok,
+                                                      default=default))
+        return descriptions
 
     @override
     def get_relations(self,  cursor: Cursor, table_name: str):
@@ -85,16 +133,30 @@ class Introspection(BaseIntrospection):
         Return a dictionary of {field_name: (field_name_other_table, other_table)}
         representing all relationships to the given table.
         """
-        cursor.execute("""
-            SELECT c2.relname, a1.attname, a2.attname
+        return self.get_all_relations(cursor, [table_name]).get(table_name, {})
+
+    @override
+    def get_all_relations(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, TRelation]]:
+        """
+        Return a dictionary of {table_name: relations} for all given tables in
+        a single query.
+        """
+        rows = self.iter_rows(cursor, """
+            SELECT c1.relname, c2.relname, a1.attname, a2.attname
             FROM pg_constraint con
             LEFT JOIN pg_class c1 ON con.conrelid = c1.oid
+            JOIN pg_namespace ns ON c1.relnamespace = ns.oid
             LEFT JOIN pg_class c2 ON con.confrelid = c2.oid
             LEFT JOIN pg_attribute a1 ON c1.oid = a1.attrelid AND a1.attnum = con.conkey[1]
             LEFT JOIN pg_attribute a2 ON c2.oid = a2.attrelid AND a2.attnum = con.confkey[1]
-            WHERE c1.relname = %s
-                AND con.contype = 'f'""", [table_name])
-        return {row[1]: TRelation(row[2], row[0])for row in cursor.fetchall()}
+            WHERE ns.nspname = current_schema()
+                AND c1.relname = ANY(%s)
+                AND con.contype = 'f'
+            ORDER BY c1.relname, a1.attnum""", [table_names], table_names)
+        relations: dict[str, dict[str, TRelation]] = {table_name: {} for table_name in table_names}
+        for table_name, table_ref, column_name, field_ref in rows:
+            relations[table_name][column_name] = TRelation(field_ref, table_ref)
+        return relations
 
     @override
     def get_key_columns(self,  cursor: Cursor, table_name: str):
@@ -125,7 +187,7 @@ class Introspection(BaseIntrospection):
             AND attr.attnum = idx.indkey[0]
             AND c.relname = %s""", [table_name])
         indexes: dict[str, dict[str, bool]] = {}
-        for row in cursor.fetchall():
+        for row in cursor:
             # row[1] (idx.indkey) is stored in the DB as an array. It comes out as
             # a string of space-separated integers. This designates the field
             # indexes (1-based) of the fields that have indexes on the table.
@@ -148,14 +210,23 @@ class Introspection(BaseIntrospection):
         one or more columns. Also retrieve the definition of expression-based
         indexes.
         """
-        constraints: dict[str, ColumnInfo] = {}
+        return self.get_all_constraints(cursor, [table_name]).get(table_name, {})
+
+    @override
+    def get_all_constraints(self, cursor: Cursor, table_names: list[str]) -> dict[str, dict[str, ColumnInfo]]:
+        """
+        Retrieve the constraints of every given table, issuing one query for
+        constraints and one for indexes regardless of the number of tables.
+        """
+        all_constraints: dict[str, dict[str, ColumnInfo]] = {table_name: {} for table_name in table_names}
         # Loop over the key table, collecting things as constraints. The column
         # array must return column names in the same order in which they were
         # created.
         # The subquery containing generate_series can be replaced with
         # "WITH ORDINALITY" when support for PostgreSQL 9.3 is dropped.
-        cursor.execute("""
+        rows = self.iter_rows(cursor, """
             SELECT
+                cl.relname,
                 c.conname,
                 array(
                     SELECT attname
@@ -176,27 +247,28 @@ class Introspection(BaseIntrospection):
             FROM pg_constraint AS c
             JOIN pg_class AS cl ON c.conrelid = cl.oid
             JOIN pg_namespace AS ns ON cl.relnamespace = ns.oid
-            WHERE ns.nspname = %s AND cl.relname = %s
-        """, ["public", table_name])
-        for constraint, columns, kind, used_cols, options in cursor.fetchall():
-            constraints[constraint] = {"columns": cast(list[str], columns),
-                                       "primary_key": kind == "p",
-                                       "unique": kind in ["p", "u"],
-                                       "foreign_key": tuple(cast(str, used_cols).split(".", 1)) if kind == "f" else None,
-                                       "check": kind == "c",
-                                       "index": False,
-                                       "options": options}
+            WHERE ns.nspname = current_schema() AND cl.relname = ANY(%s)
+            ORDER BY cl.relname
+        """, [table_names], table_names)
+        for table_name, constraint, columns, kind, used_cols, options in rows:
+            all_constraints[table_name][constraint] = {"columns": columns,
+                                                       "primary_key": kind == "p",
+                                                       "unique": kind in ["p", "u"],
+                                                       "foreign_key": tuple(used_cols.split(".", 1)) if kind == "f" else None,
+                                                       "check": kind == "c",
+                                                       "index": False,
+                                                       "options": options}
         # Now get indexes
         # The row_number() function for ordering the index fields can be
         # replaced by WITH ORDINALITY in the unnest() functions when support
         # for PostgreSQL 9.3 is dropped.
-        cursor.execute("""
+        rows = self.iter_rows(cursor, """
             SELECT
-                indexname, array_agg(attname ORDER BY rnum), indisunique, indisprimary,
+                tablename, indexname, array_agg(attname ORDER BY rnum), indisunique, indisprimary,
                 array_agg(ordering ORDER BY rnum), amname, exprdef, s2.attoptions
             FROM (
                 SELECT
-                    row_number() OVER () as rnum, c2.relname as indexname,
+                    row_number() OVER () as rnum, c.relname as tablename, c2.relname as indexname,
                     idx.*, attr.attname, am.amname,
                     CASE
                         WHEN idx.indexprs IS NOT NULL THEN
@@ -215,14 +287,16 @@ class Introspection(BaseIntrospection):
                     FROM pg_index i
                 ) idx
                 LEFT JOIN pg_class c ON idx.indrelid = c.oid
+                JOIN pg_namespace ns ON c.relnamespace = ns.oid
                 LEFT JOIN pg_class c2 ON idx.indexrelid = c2.oid
                 LEFT JOIN pg_am am ON c2.relam = am.oid
                 LEFT JOIN pg_attribute attr ON attr.attrelid = c.oid AND attr.attnum = idx.key
-                WHERE c.relname = %s
+                WHERE ns.nspname = current_schema() AND c.relname = ANY(%s)
             ) s2
-            GROUP BY indexname, indisunique, indisprimary, amname, exprdef, attoptions;
-        """, [table_name])
-        for index, columns, unique, primary, orders, _type_, definition, options in cursor.fetchall():
+            GROUP BY tablename, indexname, indisunique, indisprimary, amname, exprdef, attoptions
+        """, [table_names], table_names)
+        for table_name, index, columns, unique, primary, orders, _type_, definition, options in rows:
+            constraints = all_constraints[table_name]
             if index not in constraints:
                 constraints[index] = {"columns": columns if columns != [None] else [],
                                       "orders": orders if orders != [None] else [],
@@ -234,4 +308,5 @@ class Introspection(BaseIntrospection):
                                       # "type": Index.suffix if type_ == 'btree' else type_,
                                       "definition": definition,
                                       "options": options}
-        return constraints
+        self._constraints_cache.update(all_constraints)
+        return all_constraints
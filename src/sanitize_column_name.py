@@ -1,37 +1,64 @@
 import re
+from functools import lru_cache
 from keyword import iskeyword
 from typing import Literal
 
 import deal
-import inflection
-from slugify import slugify
 
+non_word_re = re.compile(r'\W')
+# the same substitution for ascii strings, done by str.translate without entering the regex engine
+ascii_non_word_table = str.maketrans({chr(c): '_' for c in range(128) if not (chr(c).isalnum() or chr(c) == '_')})
+# deletes what filter(str.isalnum, ...) would drop from the (ascii) slugified names
+ascii_non_alnum_table = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isalnum()))
+# lowercase names that none of the renaming rules of normalize_col_name apply to (apart from the reserved words)
+plain_field_name_re = re.compile(r'[a-z](?:[a-z0-9_]*[a-z0-9])?')
 
+
+# names repeat heavily across tables and columns ('id', 'created_at', ...), and the result is an immutable str,
+# so the identifiers are memoized right here for every caller
+@lru_cache(maxsize=8192)
 @deal.pure
 def str_to_py_identifier(input_string: str, *, is_related: bool = False, case_type: Literal['snake', 'camel', 'title', 'const'] = 'snake'):
-    sanitized_string = slugify(input_string, separator='_').replace('.', '_')
+    if input_string.isascii() and input_string.replace('_', '').isalnum():
+        # for plain ascii names, all slugify does is lowercasing them and collapsing and stripping the underscores
+        sanitized_string = '_'.join(filter(None, input_string.lower().split('_')))
+    else:
+        # imported on first use, so that the cli starts (--help, argument errors) without loading it
+        from slugify import slugify
+        sanitized_string = slugify(input_string, separator='_').replace('.', '_')
     if not sanitized_string or not sanitized_string[0].isalpha():
-        sanitized_string = f"_{''.join(filter(str.isalnum, sanitized_string))}"
+        sanitized_string = f"_{sanitized_string.translate(ascii_non_alnum_table)}"
     if iskeyword(sanitized_string):
         sanitized_string = f"{sanitized_string}_"
+    # the string is made of lowercase ascii letters, digits and underscores at this point, which inflection.underscore
+    # would return as is
     match case_type:
         case 'snake':
-            return inflection.underscore(sanitized_string)
+            return sanitized_string
         case 'camel':
+            import inflection
             return inflection.camelize(sanitized_string, False)
         case 'title':
             has_leading_underscore = '_' if sanitized_string.startswith('_') else ''
             title_cased = ''.join(word.capitalize() for word in sanitized_string.split('_'))
             return has_leading_underscore + title_cased
         case 'const':
-            return inflection.underscore(sanitized_string).upper()
+            return sanitized_string.upper()
 
 
-@deal.pure
-def normalize_col_name(col_name: str, is_related=False):
+def normalize_col_name(col_name: str, is_related=False) -> tuple[str, dict[str, str], list[str]]:
     """
     Modify the column name to make it Python-compatible as a field name
     """
+    # the result is memoized as tuples, each caller gets its own dict and list
+    new_name, field_params, field_notes = _normalize_col_name(col_name, bool(is_related))
+    return new_name, dict(field_params), list(field_notes)
+
+
+# column names repeat heavily across tables ('id', 'created_at', ...), so the actual normalization runs once per name
+@lru_cache(maxsize=4096)
+@deal.pure
+def _normalize_col_name(col_name: str, is_related: bool) -> tuple[str, tuple[tuple[str, str], ...], tuple[str, ...]]:
     field_params: dict[str, str] = {}
     field_notes: list[str] = []
     new_name = col_name.lower()
@@ -39,24 +66,34 @@ def normalize_col_name(col_name: str, is_related=False):
         field_notes.append('Field name made lowercase.')
     if is_related and col_name.endswith('_id'):
         new_name = new_name[:-3]
-    new_name, num_repl = re.subn(r'\W', '_', new_name)
-    if num_repl > 0:
-        field_notes.append('Field renamed to remove nonalphanumerics and replace them with underscores.')
-    if new_name.startswith('_'):
-        new_name = f'attr{new_name}'
-        field_notes.append("Field renamed because it started with '_'.")
-    if new_name.endswith('_'):
-        new_name = f'{new_name}attr'
-        field_notes.append("Field renamed because it ended with '_'.")
-    if new_name[0].isdigit():
-        new_name = f'number_{new_name}'
-        field_notes.append("Field renamed because it wasn't a valid Python identifier.")
-    if iskeyword(new_name):
-        new_name += '_attr'
-        field_notes.append('Field renamed because it was a Python reserved word.')
-    if not new_name.isidentifier():
-        new_name = f'{new_name}_attr'
-        field_notes.append('Field renamed to ensure it is a valid Python identifier.')
+    # most names are already valid as they are, checking that with a single match skips every rule below
+    if not plain_field_name_re.fullmatch(new_name) or iskeyword(new_name):
+        # ascii names are translated, only the non-ascii ones need the (unicode aware) regex pass
+        if not new_name.isascii():
+            new_name, num_repl = non_word_re.subn('_', new_name)
+        elif not new_name.replace('_', '').isalnum():
+            translated = new_name.translate(ascii_non_word_table)
+            num_repl = int(translated != new_name)
+            new_name = translated
+        else:
+            num_repl = 0
+        if num_repl > 0:
+            field_notes.append('Field renamed to remove nonalphanumerics and replace them with underscores.')
+        if new_name.startswith('_'):
+            new_name = f'attr{new_name}'
+            field_notes.append("Field renamed because it started with '_'.")
+        if new_name.endswith('_'):
+            new_name = f'{new_name}attr'
+            field_notes.append("Field renamed because it ended with '_'.")
+        if new_name[0].isdigit():
+            new_name = f'number_{new_name}'
+            field_notes.append("Field renamed because it wasn't a valid Python identifier.")
+        if iskeyword(new_name):
+            new_name += '_attr'
+            field_notes.append('Field renamed because it was a Python reserved word.')
+        if not new_name.isidentifier():
+            new_name = f'{new_name}_attr'
+            field_notes.append('Field renamed to ensure it is a valid Python identifier.')
     if col_name != new_name:
         field_params['column'] = col_name
-    return new_name, field_params, field_notes
+    return new_name, tuple(field_params.items()), tuple(field_notes)
@@ -1,22 +1,62 @@
+from __future__ import annotations
+
 import re
-from typing import cast
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from psycopg2.extensions import cursor as Cursor
+from attrs import define, field
 from typing_extensions import override
 
 from .base import ColumnInfo, FieldInfo
 from .base import Introspection as BaseIntrospection
 from .base import TableInfo, TRelation
 
-field_size_re = re.compile(r'^\s*(?:var)?char\s*\(\s*(\d+)\s*\)\s*$')
+if TYPE_CHECKING:
+    from psycopg2.extensions import cursor as Cursor
+
+# patterns run over every field description of the CREATE TABLE statements
+references_re = re.compile(r'references (\S*) ?\(["|]?(.*)["|]?\)', re.I)
+foreign_key_re = re.compile(r'FOREIGN KEY\s*\(([^\)]*)\).*', re.I)
+key_column_re = re.compile(r'"(.*)".*references (.*) \(["|](.*)["|]\)', re.I)
+primary_key_re = re.compile('"(.*)".*PRIMARY KEY( AUTOINCREMENT)?')
+# the characters that structure a list of definitions, skipping over quoted identifiers and strings as a whole
+ddl_token_re = re.compile(r'"[^"]*"|\'[^\']*\'|`[^`]*`|\[[^\]]*\]|[(),]')
 
 
 def get_field_size(name: str):
     """ Extract the size number from a "varchar(11)" type name """
-    m = field_size_re.search(name)
-    return int(m.group(1)) if m else None
+    # called for every column, and the format is simple enough to be parsed with partitions instead of a regex
+    type_name, _, rest = name.partition('(')
+    size, closed, tail = rest.partition(')')
+    if closed and type_name.strip() in ('char', 'varchar') and (size := size.strip()).isdecimal() and not tail.strip():
+        return int(size)
+    return None
+
+
+@lru_cache(maxsize=1024)
+def get_field_descs(sql: str) -> tuple[str, ...]:
+    """
+    Split the body of a CREATE TABLE statement into its stripped column and
+    constraint definitions. Commas nested in parentheses (e.g. decimal(10, 2)
+    or UNIQUE (a, b)) or in quotes don't end a definition.
+    """
+    sql = sql.strip()
+    body = sql[sql.index('(') + 1:sql.rindex(')')]
+    field_descs: list[str] = []
+    depth = start = 0
+    for m in ddl_token_re.finditer(body):
+        if (token := m.group()) == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token == ',' and not depth:
+            field_descs.append(body[start:m.start()].strip())
+            start = m.end()
+    field_descs.append(body[start:].strip())
+    return tuple(field_descs)
 
 
+@define
 class Introspection(BaseIntrospection):
     data_types_reverse = {'bool': 'bool',
                           'boolean': 'bool',
@@ -42,6 +82,32 @@ class Introspection(BaseIntrospection):
                'Decimal': 'from decimal import Decimal',
                'buffer': 'from pony.py23compat import buffer'}
 
+    # {table_name: CREATE TABLE statement}, None for views and missing tables
+    _table_sql_cache: dict[str, str | None] = field(init=False, factory=dict)
+
+    @override
+    def clear_caches(self) -> None:
+        super().clear_caches()
+        self._table_sql_cache.clear()
+
+    def get_table_sql(self, cursor: Cursor, table_name: str) -> str | None:
+        """
+        Return the CREATE TABLE statement of the given table, or None if there
+        is no such table. Every method parses it, and the referenced tables are
+        looked up for each foreign key, so the statements of all the tables are
+        read into the cache with a single query on the first miss.
+        """
+        if table_name not in self._table_sql_cache:
+            cursor.execute("SELECT tbl_name, sql FROM sqlite_master WHERE type = ?", ["table"])
+            self._table_sql_cache.update(cursor)
+            self._table_sql_cache.setdefault(table_name, None)
+        return self._table_sql_cache[table_name]
+
+    @override
+    def can_open_connections(self) -> bool:
+        # every connection to a private in-memory database gets a new, empty one
+        return self.provider.pool.filename != ':memory:'
+
     @override
     def get_field_type(self, data_type: str | int, description: FieldInfo) -> tuple[str, dict[str, int] | None, str | None]:
         opts = None
@@ -54,10 +120,8 @@ class Introspection(BaseIntrospection):
             assert size is not None
             opts = {'max_len': size}
         _import = self.imports.get(field_type)
-        if description.default and 'nextval' in description.default:
-            # ???
-            if field_type == 'int':
-                return 'AUTO', opts, _import
+        if description.is_autoincrement and field_type == 'int':
+            return 'AUTO', opts, _import
         return field_type, opts, _import
 
     @override
@@ -69,7 +133,7 @@ class Introspection(BaseIntrospection):
             SELECT name, type FROM sqlite_master
             WHERE type in ('table', 'view') AND NOT name='sqlite_sequence'
             ORDER BY name""")
-        return [TableInfo(row[0], row[1][0]) for row in cursor.fetchall()]
+        return [TableInfo(row[0], row[1][0]) for row in cursor]
 
     @override
     def get_table_description(self, cursor: Cursor, table_name: str):
@@ -77,14 +141,14 @@ class Introspection(BaseIntrospection):
         Return a description of the table with the DB-API cursor.description
         interface.
         """
-        cursor.execute(f'PRAGMA table_info({self.provider.quote_name(table_name)})')
+        cursor.execute('SELECT * FROM pragma_table_info(?)', [table_name])
         return [FieldInfo(name=field[1],
                           type_code=field[2],
                           display_size=None,
                           internal_size=get_field_size(field[2]),
                           precision=None,
                           scale=None,
-                          null_ok=not field[3]) for field in cursor.fetchall()]
+                          null_ok=not field[3]) for field in cursor]
 
     @override
     def get_relations(self, cursor: Cursor, table_name: str):
@@ -95,36 +159,29 @@ class Introspection(BaseIntrospection):
         # Dictionary of relations to return
         relations: dict[str, TRelation] = {}
         # Schema for this table
-        cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type = ?", [table_name, "table"])
-        if (raw := cursor.fetchone()) is None:
+        if (raw := self.get_table_sql(cursor, table_name)) is None:
             # It might be a view, then no results will be returned
             return relations
-        results = cast(tuple[str], raw)[0].strip()
-        results = results[results.index('(') + 1:results.rindex(')')]
         # Walk through and look for references to other tables. SQLite doesn't
         # really have enforced references, but since it echoes out the SQL used
         # to create the table we can look for REFERENCES statements used there.
-        for field_desc in results.split(','):
-            field_desc = field_desc.strip()
+        for field_desc in get_field_descs(raw):
             if field_desc.startswith("UNIQUE"):
                 continue
-            m = re.search(r'references (\S*) ?\(["|]?(.*)["|]?\)', field_desc, re.I)
+            m = references_re.search(field_desc)
             if not m:
                 continue
             table, column = [s.strip('"') for s in m.groups()]
             if field_desc.startswith("FOREIGN KEY"):
                 # Find name of the target FK field
-                assert (m := re.match(r'FOREIGN KEY\s*\(([^\)]*)\).*', field_desc, re.I))
+                assert (m := foreign_key_re.match(field_desc))
                 field_name = m.groups()[0].strip('"')
             else:
                 field_name = field_desc.split()[0].strip('"')
-            cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ?", [table])
-            result = cursor.fetchall()[0]
-            other_table_results = result[0].strip()
-            li, ri = other_table_results.index('('), other_table_results.rindex(')')
-            other_table_results = other_table_results[li + 1:ri]
-            for other_desc in other_table_results.split(','):
-                other_desc = other_desc.strip()
+            if (other_table_sql := self.get_table_sql(cursor, table)) is None:
+                # SQLite accepts references to tables that don't exist (yet)
+                continue
+            for other_desc in get_field_descs(other_table_sql):
                 if other_desc.startswith('UNIQUE'):
                     continue
                 other_name = other_desc.split(' ', 1)[0].strip('"')
@@ -141,17 +198,14 @@ class Introspection(BaseIntrospection):
         """
         key_columns: list[tuple[str, str, str]] = []
         # Schema for this table
-        cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type = ?", [table_name, "table"])
-        results = cast(str, cursor.fetchone()[0]).strip()
-        results = results[results.index('(') + 1:results.rindex(')')]
+        results: str = self.get_table_sql(cursor, table_name)  # type: ignore[assignment]
         # Walk through and look for references to other tables. SQLite doesn't
         # really have enforced references, but since it echoes out the SQL used
         # to create the table we can look for REFERENCES statements used there.
-        for field_desc in results.split(','):
-            field_desc = field_desc.strip()
+        for field_desc in get_field_descs(results):
             if field_desc.startswith("UNIQUE"):
                 continue
-            m = re.search(r'"(.*)".*references (.*) \(["|](.*)["|]\)', field_desc, re.I)
+            m = key_column_re.search(field_desc)
             if not m:
                 continue
             groups = m.groups()
@@ -183,22 +237,16 @@ class Introspection(BaseIntrospection):
     def get_primary_key_column(self, cursor: Cursor, table_name: str):
         """Return the column name of the primary key for the given table."""
         # Don't use PRAGMA because that causes issues with some transactions
-        cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type = ?", [table_name, "table"])
-        row = cursor.fetchone()
-        if row is None:
+        if (sql := self.get_table_sql(cursor, table_name)) is None:
             raise ValueError("Table %s does not exist" % table_name)
-        results = row[0].strip()
-        results = results[results.index('(') + 1:results.rindex(')')]
-        for field_desc in results.split(','):
-            field_desc = field_desc.strip()
-            m = re.search('"(.*)".*PRIMARY KEY( AUTOINCREMENT)?', field_desc)
+        for field_desc in get_field_descs(sql):
+            m = primary_key_re.search(field_desc)
             if m:
                 return m.groups()[0]
         return None
 
     def _table_info(self, cursor: Cursor, name: str):
-        quote_name = self.provider.quote_name
-        cursor.execute('PRAGMA table_info(%s)' % quote_name(name))
+        cursor.execute('SELECT * FROM pragma_table_info(?)', [name])
         # cid, name, type, notnull, default_value, pk
         return [{'name': field[1],
                  'type': field[2],
@@ -206,7 +254,7 @@ class Introspection(BaseIntrospection):
                  'null_ok': not field[3],
                  'default': field[4],
                  'pk': field[5],  # undocumented
-                 } for field in cursor.fetchall()]
+                 } for field in cursor]
 
     @override
     def get_constraints(self, cursor: Cursor, table_name: str) -> dict[str, ColumnInfo]:
@@ -215,34 +263,37 @@ class Introspection(BaseIntrospection):
         one or more columns.
         """
         constraints: dict[str, ColumnInfo] = {}
-        # Get the index info
-        quote_name = self.provider.quote_name
-        cursor.execute("PRAGMA index_list(%s)" % quote_name(table_name))
-        for row in cursor.fetchall():
-            # Sqlite3 3.8.9+ has 5 columns, however older versions only give 3
-            # columns. Discard last 2 columns if there.
-            _number, index, unique = row[:3]
-            # Get the index info for that index
-            cursor.execute('PRAGMA index_info(%s)' % quote_name(index))
-            for _index_rank, _column_rank, column in cursor.fetchall():
-                if index not in constraints:
-                    constraints[index] = {"columns": cast(list[str], []),
-                                          "primary_key": False,
-                                          "unique": bool(unique),
-                                          "check": False,
-                                          "index": True}
-                constraints[index]['columns'].append(column)
-            # Add type and column orders for indexes
-            if constraints[index]['index'] and not constraints[index]['unique']:
+        # Get the index info: the columns of every index of the table in one query, joining the table-valued
+        # pragma functions. They take the names as bound parameters, so the statements are identical for every
+        # table and get reused from the sqlite3 statement cache.
+        cursor.execute("""
+            SELECT il.name, il."unique", ii.name
+            FROM pragma_index_list(?) AS il
+            JOIN pragma_index_info(il.name) AS ii
+            ORDER BY il.seq, ii.seqno""", [table_name])
+        for index, unique, column in cursor:
+            if index not in constraints:
+                constraints[index] = {"columns": [],
+                                      "primary_key": False,
+                                      "unique": bool(unique),
+                                      "check": False,
+                                      "index": True}
+            constraints[index]['columns'].append(column)
+        # Add type and column orders for indexes, reading the definitions of all the indexes of the table at once
+        if any(not constraint['unique'] for constraint in constraints.values()):
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", [table_name])
+            index_sqls: dict[str, str | None] = dict(cursor)
+            for index, constraint in constraints.items():
+                if constraint['unique']:
+                    continue
                 # SQLite doesn't support any index type other than b-tree
                 # constraints[index]['type'] = Index.suffix
-                cursor.execute(f"SELECT sql FROM sqlite_master WHERE type='index' AND name={quote_name(index)}")
                 orders = []
-                # There would be only 1 row to loop over
-                for sql, in cursor.fetchall():
-                    order_info = sql.split('(')[-1].split(')')[0].split(',')
+                if (sql := index_sqls.get(index)) is not None:
+                    # only the column list after the last '(' is split, the rest of the statement is sliced off in place
+                    order_info = sql.rpartition('(')[2].partition(')')[0].split(',')
                     orders = ['DESC' if info.endswith('DESC') else 'ASC' for info in order_info]
-                constraints[index]['orders'] = orders
+                constraint['orders'] = orders
         # Get the PK
         pk_column = self.get_primary_key_column(cursor, table_name)
         if pk_column:
@@ -1,9 +1,12 @@
+from functools import lru_cache
 from importlib import import_module
 from typing import cast
 
 from pony.orm.core import Database
 
 
+# the resolved object is a module level attribute, so repeated runs in the same process can reuse it
+@lru_cache(maxsize=128)
 def import_from_string(import_str: str):
     module_str, _, attr_str = import_str.partition(':')
     module = import_module(module_str)
@@ -0,0 +1,53 @@
+import unittest
+
+from MySQLdb.constants import FIELD_TYPE
+
+from src.mysql import Introspection
+
+# information_schema.columns rows, as selected by get_all_table_descriptions
+COLUMNS = [('counter', 'id', 'int', None, 10, 0, 'auto_increment', None, 0, 'NO'),
+           ('counter', 'hits', 'int', None, 10, 0, '', '0', 0, 'NO'),
+           ('shape', 'id', 'int', None, 10, 0, 'auto_increment', None, 0, 'NO'),
+           ('shape', 'area', 'st_geometry', None, None, None, '', None, 0, 'YES')]
+# cursor.description of the tables that need a "SELECT * LIMIT 0" probe
+DESCRIPTIONS = {'`shape`': [('id', FIELD_TYPE.LONG, 11, 4, 10, 0, 0), ('area', FIELD_TYPE.GEOMETRY, None, 8, 0, 0, 1)]}
+
+
+class Cursor:
+    description = None
+
+    def execute(self, query, params=None):
+        self.rows = COLUMNS
+        for table_name, description in DESCRIPTIONS.items():
+            if query == f"SELECT * FROM {table_name} LIMIT 0":
+                self.description, self.rows = description, []
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class Provider:
+    def quote_name(self, name):
+        return f'`{name}`'
+
+
+class AutoIncrementTest(unittest.TestCase):
+    def setUp(self):
+        self.introspection = Introspection(connection=None, provider=Provider())
+        self.descriptions = self.introspection.get_all_table_descriptions(Cursor(), ['counter', 'shape'])
+
+    def assert_auto(self, table_name):
+        field_id, field_other = self.descriptions[table_name]
+        self.assertTrue(field_id.is_autoincrement)
+        self.assertEqual(self.introspection.get_field_type(field_id.type_code, field_id)[0], 'AUTO')
+        self.assertFalse(field_other.is_autoincrement)
+
+    def test_auto_increment_without_probe(self):
+        self.assert_auto('counter')
+
+    def test_auto_increment_with_probe(self):
+        self.assert_auto('shape')
+
+
+if __name__ == '__main__':
+    unittest.main()